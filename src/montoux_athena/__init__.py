@@ -1,7 +1,7 @@
-__all__ = ["__version__", "AthenaQuery"]
+__all__ = ["__version__", "AthenaQuery", "AthenaQueryError"]
 
 from importlib import metadata
 
-from .athena import AthenaQuery
+from .athena import AthenaQuery, AthenaQueryError
 
 __version__ = metadata.version("montoux_athena")
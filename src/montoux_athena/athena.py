@@ -1,6 +1,174 @@
-import boto3
+import collections
+import io
+import json
+import re
+import threading
 import time
-import pandas as pd
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError, WaiterError
+from botocore.waiter import WaiterModel, create_waiter_with_client
+
+# Status checks per waiter run, waiting without a limit repeats the run.
+_WAIT_MAX_ATTEMPTS = 120
+
+# boto3 does not ship waiters for Athena, so define one for query completion.
+_WAITER_MODEL = WaiterModel({
+    'version': 2,
+    'waiters': {
+        'QueryCompleted': {
+            'operation': 'GetQueryExecution',
+            'delay': 1,
+            'maxAttempts': _WAIT_MAX_ATTEMPTS,
+            'acceptors': [
+                {'state': 'success', 'matcher': 'path', 'argument': 'QueryExecution.Status.State', 'expected': 'SUCCEEDED'},
+                {'state': 'failure', 'matcher': 'path', 'argument': 'QueryExecution.Status.State', 'expected': 'FAILED'},
+                {'state': 'failure', 'matcher': 'path', 'argument': 'QueryExecution.Status.State', 'expected': 'CANCELLED'},
+            ],
+        },
+    },
+})
+
+# Read buffer for streaming query results from S3.
+_S3_READ_BUFFER_SIZE = 32 * 1024 * 1024
+
+# Read buffer for streaming small line based files (partition listings, manifests) from S3.
+_S3_LINE_BUFFER_SIZE = 1024 * 1024
+
+# Block size for the pyarrow CSV reader, each block is parsed on its own thread.
+_PYARROW_BLOCK_SIZE = 8 * 1024 * 1024
+
+# Athena column types that pandas.read_csv would parse as numbers.
+_NUMERIC_TYPES = ('tinyint', 'smallint', 'integer', 'int', 'bigint', 'float', 'real', 'double', 'decimal')
+
+# Pandas dtypes matching Athena column types, as narrow as the type allows and nullable.
+_PANDAS_DTYPES = {
+    'tinyint': 'Int8',
+    'smallint': 'Int16',
+    'integer': 'Int32',
+    'int': 'Int32',
+    'bigint': 'Int64',
+    'float': 'float32',
+    'real': 'float32',
+    'double': 'float64',
+    'boolean': 'boolean',
+    'char': 'string',
+    'varchar': 'string',
+    'string': 'string',
+}
+
+# Athena column types parsed as datetimes.
+_DATE_TYPES = ('date', 'timestamp')
+
+# Characters Hive escapes in partition path names (FileUtils.escapePathName).
+_HIVE_ESCAPE_CHARS = frozenset([chr(c) for c in range(0x01, 0x20)] + list('"#%\'*/:=?\\\x7f{[]^'))
+
+# Hive's partition name for NULL or empty values.
+_HIVE_DEFAULT_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+# Glue errors for which get_table_partitions falls back to SHOW PARTITIONS.
+_GLUE_FALLBACK_ERRORS = ('AccessDeniedException', 'EntityNotFoundException')
+
+# Single quoted SQL string literals, with '' as an escaped quote.
+_SQL_STRING_LITERAL = re.compile(r"('(?:[^']|'')*')")
+
+# Only statements with these prefixes are read-only and safe to serve from cache.
+_CACHEABLE_PREFIXES = ('select', 'with', 'show', 'describe')
+
+# Only statements with these prefixes can be wrapped in UNLOAD, anything else falls back to CSV.
+_UNLOADABLE_PREFIXES = ('select', 'with')
+
+
+def _athena_to_pandas_dtype(athena_type):
+    """
+    Get the Pandas dtype for an Athena column type.
+
+    :param str athena_type: The Athena column type, e.g. ``'integer'``
+    :return: The Pandas dtype, or None to let Pandas infer it
+    :rtype: str
+    """
+    return _PANDAS_DTYPES.get(athena_type)
+
+
+def _column_dtypes(column_info):
+    """
+    Derive Pandas dtypes from Athena column types.
+
+    :param list[dict] column_info: The Athena `ColumnInfo` of a query result
+    :return: The dtype for each column, and the columns to parse as datetimes
+    :rtype: tuple[dict, list[str]]
+    """
+    dtypes, parse_dates = {}, []
+    for x in column_info:
+        if x['Type'] in _DATE_TYPES:
+            parse_dates.append(x['Name'])
+        elif _athena_to_pandas_dtype(x['Type']) is not None:
+            dtypes[x['Name']] = _athena_to_pandas_dtype(x['Type'])
+    return dtypes, parse_dates
+
+
+def _hive_escape(value):
+    """
+    Escape a partition key or value the way Hive does in partition path names,
+    so they match the output of SHOW PARTITIONS.
+
+    :param str value: The partition key or value
+    :return: The escaped partition key or value
+    :rtype: str
+    """
+    if not value:
+        return _HIVE_DEFAULT_PARTITION
+    return ''.join(f'%{ord(c):02X}' if c in _HIVE_ESCAPE_CHARS else c for c in value)
+
+
+def _split_s3_uri(s3_uri):
+    """
+    Split an S3 URI into bucket and key.
+
+    :param str s3_uri: The S3 URI, e.g. ``s3://bucket/path/to/object``
+    :return: The bucket and key
+    :rtype: tuple[str, str]
+    """
+    s3_bucket, s3_object = s3_uri.split('s3://')[1].split('/', maxsplit=1)
+    return s3_bucket, s3_object
+
+
+def _normalize_sql(sql_query):
+    """
+    Normalize an SQL query for use as a cache key by collapsing whitespace and
+    lower casing everything outside of string literals.
+
+    :param str sql_query: The SQL query
+    :return: The normalized SQL query
+    :rtype: str
+    """
+    parts = _SQL_STRING_LITERAL.split(sql_query.strip())
+    # split() with a capturing group puts the literals at the odd indices
+    return ''.join(part if i % 2 else ' '.join(part.split()).lower() for i, part in enumerate(parts))
+
+
+class AthenaQueryError(Exception):
+    """
+    Raised when an Athena query failed or was cancelled.
+
+    :param str execution_id: The Athena execution ID
+    :param str state: The Athena execution status
+    :param str state_change_reason: The Athena status message, if any
+    """
+
+    def __init__(self, execution_id, state, state_change_reason=None):
+        message = f"Query {execution_id} {state.lower()}"
+        if state_change_reason:
+            message += f": {state_change_reason}"
+        super().__init__(message)
+        self.execution_id = execution_id
+        self.state = state
+        self.state_change_reason = state_change_reason
+
 
 class AthenaQuery:
     """
@@ -14,37 +182,480 @@ class AthenaQuery:
                  athena_database='my_database',
                  athena_output='s3://data.athena.datascience.aunz.montoux.com/')
 
-    :param dict kwargs: arguments specific to Athena query (`region_name`, `athena_database`, `athena_output`)
+    Queries run in the `workgroup` if given. `athena_output` can be omitted
+    when the workgroup enforces its own query result location.
+
+    Repeated queries can be served from an in-process cache by setting
+    `cache_size` to the maximum number of entries to keep, optionally expiring
+    them after `cache_ttl` seconds. Setting `reuse_query_results` lets Athena
+    reuse the results of a previous identical query server side, provided they
+    are no older than `result_reuse_max_age_minutes`, without scanning any data.
+    This requires a workgroup on Athena engine version 3.
+
+    The batch methods run up to `max_concurrency` (default 8) requests at once.
+    The AWS clients use a connection pool sized for that, adaptive retries and
+    TCP keep-alive, unless a `botocore.config.Config` is passed as
+    `botocore_config`.
+
+    Table metadata is cached for `metadata_ttl` seconds (default 300, None to
+    never expire), see `invalidate_metadata`. Running any statement other than
+    SELECT, WITH, SHOW or DESCRIBE through `run_query` drops the cache.
+
+    Results no larger than `small_result_threshold` bytes (default 0, disabled)
+    are fetched through the Athena `GetQueryResults` API instead of being
+    downloaded from S3 and parsed as CSV.
+
+    Query results are parsed with Pandas by default. Setting `engine` to
+    ``'pyarrow'`` parses them with the multi-threaded pyarrow CSV reader
+    instead, which requires the `pyarrow` extra.
+
+    :param dict kwargs: arguments specific to Athena query (`region_name`, `athena_database`, `athena_output`,
+        `workgroup`, `max_concurrency`, `botocore_config`, `cache_size`, `cache_ttl`, `reuse_query_results`,
+        `result_reuse_max_age_minutes`, `engine`, `small_result_threshold`, `metadata_ttl`)
     """
     
     def __init__(self, **kwargs):
         self.session = boto3.Session(region_name=kwargs.pop('region_name', None))
-        self.client = self.session.client('athena')
+        self.max_concurrency = kwargs.pop('max_concurrency', 8)
+        self.botocore_config = kwargs.pop('botocore_config', None)
+        if self.botocore_config is None:
+            self.botocore_config = Config(
+                max_pool_connections=max(32, self.max_concurrency * 2),
+                retries={'mode': 'adaptive', 'max_attempts': 10},
+                tcp_keepalive=True)
+        self.client = self.session.client('athena', config=self.botocore_config)
+        self._clients = {}
+        self._clients_lock = threading.Lock()
         
         self.athena_database = kwargs.pop('athena_database', None)
         self.athena_output = kwargs.pop('athena_output', None)
+        self.workgroup = kwargs.pop('workgroup', None)
+
+        self.cache_size = kwargs.pop('cache_size', 0)
+        self.cache_ttl = kwargs.pop('cache_ttl', None)
+        self._cache = collections.OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        self.reuse_query_results = kwargs.pop('reuse_query_results', False)
+        self.result_reuse_max_age_minutes = kwargs.pop('result_reuse_max_age_minutes', 60)
+
+        self.engine = kwargs.pop('engine', 'pandas')
+        if self.engine not in ['pandas', 'pyarrow']:
+            raise ValueError(f"Unsupported engine '{self.engine}', expected 'pandas' or 'pyarrow'")
+
+        self.small_result_threshold = kwargs.pop('small_result_threshold', 0)
+
+        self.metadata_ttl = kwargs.pop('metadata_ttl', 300)
+        self._meta_cache = {}
+        self._list_cache = {}
+
+
+    def _lazy_client(self, service_name):
+        """
+        Get a client for an AWS service, created on first use and shared
+        afterwards.
+
+        :param str service_name: The AWS service name, e.g. ``'s3'``
+        :return: The boto3 client
+        """
+        client = self._clients.get(service_name)
+        if client is None:
+            with self._clients_lock:
+                client = self._clients.get(service_name)
+                if client is None:
+                    client = self.session.client(service_name, config=self.botocore_config)
+                    self._clients[service_name] = client
+        return client
+
+
+    @property
+    def s3(self):
+        """
+        The S3 client, created on first use and shared afterwards.
+        """
+        return self._lazy_client('s3')
+
+
+    @property
+    def glue(self):
+        """
+        The Glue client, created on first use and shared afterwards.
+        """
+        return self._lazy_client('glue')
+
+
+    def _cache_get(self, key):
+        """
+        Get a value from the cache, dropping it if it has expired.
+
+        :param tuple key: The cache key
+        :return: The cached value or None
+        """
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            stored, value = entry
+            if self.cache_ttl is not None and time.monotonic() - stored > self.cache_ttl:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return value
+
+
+    def _cache_put(self, key, value):
+        """
+        Store a value in the cache, evicting the least recently used entries
+        beyond `cache_size`.
+
+        :param tuple key: The cache key
+        :param value: The value to cache
+        """
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic(), value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+    def _cache_discard(self, execution_id):
+        """
+        Remove all cache entries referring to an execution ID, e.g. because the
+        query failed.
+
+        :param str execution_id: The Athena execution ID
+        """
+        with self._cache_lock:
+            stale = [k for k, (_, v) in self._cache.items()
+                     if (k[0] == 'result' and k[1] == execution_id) or (k[0] == 'query' and v == execution_id)]
+            for key in stale:
+                del self._cache[key]
+
+
+    def clear_cache(self):
+        """
+        Remove all cached queries and results.
+        """
+        with self._cache_lock:
+            self._cache.clear()
 
         
-    def run_query(self, sql_query):
+    def _wait(self, execution_id, delay=1, max_attempts=None):
+        """
+        Wait for an Athena query to reach a terminal state.
+
+        :param str execution_id: The Athena execution ID
+        :param int delay: Seconds between status checks
+        :param int max_attempts: Maximum number of status checks before giving up, None to wait until completion
+        :return: The Athena execution status, one of SUCCEEDED, FAILED or CANCELLED
+        :rtype: str
+        :raises botocore.exceptions.WaiterError: if the query has not completed within `max_attempts`
+        """
+        waiter = create_waiter_with_client('QueryCompleted', _WAITER_MODEL, self.client)
+        while True:
+            try:
+                waiter.wait(QueryExecutionId=execution_id,
+                            WaiterConfig={'Delay': delay, 'MaxAttempts': max_attempts or _WAIT_MAX_ATTEMPTS})
+                return 'SUCCEEDED'
+            except WaiterError as e:
+                state = (e.last_response or {}).get('QueryExecution', {}).get('Status', {}).get('State')
+                if state in ['FAILED', 'CANCELLED']:
+                    self._cache_discard(execution_id)
+                    return state
+                if max_attempts is not None or state not in ['QUEUED', 'RUNNING']:
+                    raise
+
+
+    def _describe(self, execution_id):
+        """
+        Get the Athena query execution details in a single API call. Failed or
+        cancelled executions are dropped from the cache so they are run again.
+
+        :param str execution_id: The Athena execution ID
+        :return: The Athena `QueryExecution` description
+        :rtype: dict
+        """
+        execution = self.client.get_query_execution(QueryExecutionId=execution_id)['QueryExecution']
+        if execution['Status']['State'] in ['FAILED', 'CANCELLED']:
+            self._cache_discard(execution_id)
+        return execution
+
+
+    def _describe_completed(self, execution_id):
+        """
+        Get the Athena query execution details, waiting for the query to reach
+        a terminal state first if it is still queued or running.
+
+        :param str execution_id: The Athena execution ID
+        :return: The Athena `QueryExecution` description
+        :rtype: dict
+        """
+        execution = self._describe(execution_id)
+        if execution['Status']['State'] in ['QUEUED', 'RUNNING']:
+            self._wait(execution_id)
+            execution = self._describe(execution_id)
+        return execution
+
+
+    def _open_s3(self, s3_uri, buffer_size=_S3_READ_BUFFER_SIZE):
+        """
+        Open an S3 object as a buffered stream.
+
+        :param str s3_uri: The S3 URI of the object
+        :param int buffer_size: The read buffer size in bytes
+        :return: A buffered binary stream over the object body
+        :rtype: io.BufferedReader
+        """
+        s3_bucket, s3_object = _split_s3_uri(s3_uri)
+        body = self.s3.get_object(Bucket=s3_bucket, Key=s3_object)['Body']
+        return io.BufferedReader(body, buffer_size=buffer_size)
+
+
+    def _is_small_result(self, s3_uri):
+        """
+        Check whether a query result object is within `small_result_threshold`.
+
+        :param str s3_uri: The S3 URI of the query result
+        :rtype: bool
+        """
+        if not self.small_result_threshold:
+            return False
+        s3_bucket, s3_object = _split_s3_uri(s3_uri)
+        return self.s3.head_object(Bucket=s3_bucket, Key=s3_object)['ContentLength'] <= self.small_result_threshold
+
+
+    def _result_dtypes(self, execution_id):
+        """
+        Derive Pandas dtypes from the Athena column types of a query result.
+
+        :param str execution_id: The Athena execution ID
+        :return: The dtype for each column, and the columns to parse as datetimes
+        :rtype: tuple[dict, list[str]]
+        """
+        result_set = self.client.get_query_results(QueryExecutionId=execution_id, MaxResults=1)['ResultSet']
+        return _column_dtypes(result_set['ResultSetMetadata']['ColumnInfo'])
+
+
+    def _read_csv(self, f, dtypes=None, parse_dates=None):
+        """
+        Parse an Athena result CSV into a Pandas dataframe using the configured
+        engine.
+
+        :param f: A binary file-like object with the CSV contents
+        :param dict dtypes: The dtype for each column, only used by the Pandas engine
+        :param list[str] parse_dates: The columns to parse as datetimes, only used by the Pandas engine
+        :return: The parsed Pandas dataframe
+        :rtype: pandas.DataFrame
+        """
+        if self.engine == 'pyarrow':
+            import pyarrow.csv as pacsv
+
+            table = pacsv.read_csv(f, read_options=pacsv.ReadOptions(use_threads=True, block_size=_PYARROW_BLOCK_SIZE))
+            return table.to_pandas(self_destruct=True)
+
+        import pandas as pd
+
+        if not dtypes and not parse_dates:
+            return pd.read_csv(f, header=0)
+        return pd.read_csv(f, header=0, dtype=dtypes, parse_dates=parse_dates or False, engine='c', low_memory=False)
+
+
+    def _iter_query_result_rows(self, execution_id):
+        """
+        Iterate over the rows of an Athena query result through the paginated
+        `GetQueryResults` API.
+
+        :param str execution_id: The Athena execution ID
+        :return: The column info, followed by each row as a list of strings (None for NULL)
+        :rtype: iterator
+        """
+        paginator = self.client.get_paginator('get_query_results')
+        for i, page in enumerate(paginator.paginate(QueryExecutionId=execution_id)):
+            if i == 0:
+                yield page['ResultSet']['ResultSetMetadata']['ColumnInfo']
+            for row in page['ResultSet']['Rows']:
+                yield [x.get('VarCharValue') for x in row['Data']]
+
+
+    def _read_query_results(self, execution, dtypes=None, downcast=True):
+        """
+        Read an Athena query result into a Pandas dataframe through the
+        `GetQueryResults` API, converting columns as `pandas.read_csv` would.
+
+        :param dict execution: The Athena `QueryExecution` description
+        :param dict dtypes: The Pandas dtype for individual columns
+        :param bool downcast: Derive the Pandas dtypes from the Athena column types
+        :return: The Athena execution output Pandas dataframe
+        :rtype: pandas.DataFrame
+        """
+        import pandas as pd
+
+        rows = self._iter_query_result_rows(execution['QueryExecutionId'])
+        column_info = next(rows)
+        # For DML queries the first row holds the column labels
+        if execution.get('StatementType') == 'DML':
+            next(rows, None)
+
+        parse_dates = []
+        if downcast:
+            derived, parse_dates = _column_dtypes(column_info)
+            dtypes = {**derived, **(dtypes or {})}
+        dtypes = dtypes or {}
+
+        df = pd.DataFrame(list(rows), columns=[x['Name'] for x in column_info])
+        for x in column_info:
+            name = x['Name']
+            if x['Type'] == 'boolean':
+                df[name] = df[name].map({'true': True, 'false': False})
+            # Cast the strings straight to the target dtype, going through
+            # to_numeric first would round bigint values above 2**53 with NULLs
+            if name in dtypes:
+                df[name] = df[name].astype(dtypes[name])
+            elif name in parse_dates:
+                df[name] = pd.to_datetime(df[name])
+            elif x['Type'] in _NUMERIC_TYPES:
+                df[name] = pd.to_numeric(df[name])
+        return df
+
+
+    def _read_unload(self, execution):
+        """
+        Read the Parquet files written by an UNLOAD query into a Pandas
+        dataframe, using the data manifest Athena writes next to the results.
+
+        :param dict execution: The Athena `QueryExecution` description
+        :return: The Athena execution output Pandas dataframe
+        :rtype: pandas.DataFrame
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        manifest_uri = execution['Statistics']['DataManifestLocation']
+        with io.TextIOWrapper(self._open_s3(manifest_uri, buffer_size=_S3_LINE_BUFFER_SIZE), encoding='utf-8') as f:
+            s3_uris = [line.strip() for line in f if line.strip()]
+
+        tables = []
+        for s3_uri in s3_uris:
+            s3_bucket, s3_object = _split_s3_uri(s3_uri)
+            body = self.s3.get_object(Bucket=s3_bucket, Key=s3_object)['Body'].read()
+            tables.append(pq.read_table(pa.py_buffer(body)))
+
+        if not tables:
+            # No rows were unloaded, keep the columns of the result schema
+            import pandas as pd
+
+            result_set = self.client.get_query_results(QueryExecutionId=execution['QueryExecutionId'], MaxResults=1)['ResultSet']
+            column_info = result_set['ResultSetMetadata']['ColumnInfo']
+            dtypes, parse_dates = _column_dtypes(column_info)
+            dtypes.update((name, 'datetime64[ns]') for name in parse_dates)
+            return pd.DataFrame({x['Name']: pd.Series(dtype=dtypes.get(x['Name'], object)) for x in column_info})
+        return pa.concat_tables(tables).to_pandas(self_destruct=True)
+
+
+    def run_query(self, sql_query, database=None, unload=False, **kwargs):
         """
         Run an Athena query.
 
+        With `unload` set, a SELECT query is wrapped in an UNLOAD statement so
+        Athena writes its results as Parquet under `athena_output`, which
+        `get_query_result_df` then reads without parsing CSV. This requires the
+        `pyarrow` extra. Other statements are run as is.
+
         :param str sql_query: The SQL query to send to Athena
+        :param str database: The Athena database, defaults to `athena_database`
+        :param bool unload: Materialize the results as Parquet rather than CSV
+        :param dict kwargs: additional `start_query_execution` parameters, overriding the defaults (e.g. `WorkGroup`)
         :return: The Athena execution ID
         :rtype: str
         """
-        response = self.client.start_query_execution(
-            QueryString=sql_query,
-            QueryExecutionContext={
-                'Database': self.athena_database
-            },
-            ResultConfiguration={
+        database = database or self.athena_database
+        normalized = _normalize_sql(sql_query)
+
+        cache_key = None
+        if self.cache_size and normalized.startswith(_CACHEABLE_PREFIXES):
+            # start_query_execution overrides such as WorkGroup change the result, so they are part of the key
+            cache_key = ('query', database, normalized, bool(unload), json.dumps(kwargs, sort_keys=True, default=str))
+            execution_id = self._cache_get(cache_key)
+            if execution_id is not None:
+                return execution_id
+
+        if unload and normalized.startswith(_UNLOADABLE_PREFIXES):
+            if not self.athena_output:
+                raise ValueError("unload requires athena_output to be set")
+            unload_location = f"{self.athena_output.rstrip('/')}/unload/{uuid.uuid4()}/"
+            # Drop trailing semicolons and close the paren on its own line so a trailing -- comment is harmless
+            sql_query = re.sub(r'[\s;]+$', '', sql_query)
+            sql_query = f"UNLOAD (\n{sql_query}\n) TO '{unload_location}' WITH (format = 'PARQUET', compression = 'SNAPPY')"
+
+        params = {
+            'QueryString': sql_query,
+            'QueryExecutionContext': {
+                'Database': database
+            }
+        }
+        if self.athena_output:
+            params['ResultConfiguration'] = {
                 'OutputLocation': self.athena_output
-            })
+            }
+        if self.workgroup:
+            params['WorkGroup'] = self.workgroup
+        if self.reuse_query_results:
+            params['ResultReuseConfiguration'] = {
+                'ResultReuseByAgeConfiguration': {
+                    'Enabled': True,
+                    'MaxAgeInMinutes': self.result_reuse_max_age_minutes
+                }
+            }
+        params.update(kwargs)
+
+        response = self.client.start_query_execution(**params)
 
-        return response['QueryExecutionId']
+        # DDL such as CREATE, DROP, ALTER or MSCK REPAIR may change table metadata
+        if not normalized.startswith(_CACHEABLE_PREFIXES):
+            self.invalidate_metadata()
+
+        execution_id = response['QueryExecutionId']
+        if cache_key is not None:
+            self._cache_put(cache_key, execution_id)
+        return execution_id
 
     
+    def run_queries(self, sql_queries, max_concurrency=None):
+        """
+        Run several Athena queries concurrently.
+
+        Each query is either an SQL string or a dict of `run_query` arguments,
+        e.g. ``{'sql_query': 'select 1', 'database': 'other', 'WorkGroup': 'adhoc'}``.
+
+        :param list sql_queries: The SQL queries to send to Athena
+        :param int max_concurrency: The maximum number of queries submitted at once, defaults to `max_concurrency`
+        :return: The Athena execution IDs, in the order of `sql_queries`
+        :rtype: list[str]
+        """
+        def run(query):
+            if isinstance(query, dict):
+                return self.run_query(**query)
+            return self.run_query(query)
+
+        with ThreadPoolExecutor(max_workers=max_concurrency or self.max_concurrency) as pool:
+            return list(pool.map(run, sql_queries))
+
+
+    def wait_all(self, execution_ids, max_concurrency=None):
+        """
+        Wait for several Athena queries to reach a terminal state.
+
+        :param list[str] execution_ids: The Athena execution IDs
+        :param int max_concurrency: The maximum number of queries polled at once, defaults to `max_concurrency`
+        :return: The Athena execution statuses, in the order of `execution_ids`
+        :rtype: list[str]
+        """
+        with ThreadPoolExecutor(max_workers=max_concurrency or self.max_concurrency) as pool:
+            return list(pool.map(self._wait, execution_ids))
+
+
     def get_query_status(self, execution_id, wait=False):
         """
         Get Athena query status.
@@ -53,14 +664,10 @@ class AthenaQuery:
         :return: The Athena execution status
         :rtype: str
         """
-        status = self.client.get_query_execution(QueryExecutionId=execution_id)['QueryExecution']['Status']['State']
-        
         if wait:
-            while status in ['RUNNING', 'QUEUED']:
-                time.sleep(1)
-                status = self.client.get_query_execution(QueryExecutionId=execution_id)['QueryExecution']['Status']['State']
-        
-        return status
+            return self._wait(execution_id)
+
+        return self._describe(execution_id)['Status']['State']
 
     
     def get_query_statistics(self, execution_id):
@@ -71,14 +678,10 @@ class AthenaQuery:
         :return: The Athena execution status
         :rtype: str
         """
-        status = self.client.get_query_execution(QueryExecutionId=execution_id)['QueryExecution']['Status']['State']
-        
-        while status in ['RUNNING', 'QUEUED']:
-            time.sleep(1)
-            status = self.client.get_query_execution(QueryExecutionId=execution_id)['QueryExecution']['Status']['State']
-        
-        if status in ['SUCCEEDED', 'FAILED']:
-            return self.client.get_query_execution(QueryExecutionId=execution_id)['QueryExecution']['Statistics']
+        execution = self._describe_completed(execution_id)
+
+        if execution['Status']['State'] in ['SUCCEEDED', 'FAILED']:
+            return execution['Statistics']
         
         return None
     
@@ -91,7 +694,7 @@ class AthenaQuery:
         :return: The Athena status message
         :rtype: str
         """
-        return self.client.get_query_execution(QueryExecutionId=execution_id)['QueryExecution']['Status']['StateChangeReason']
+        return self._describe(execution_id)['Status'].get('StateChangeReason')
 
     
     def get_query_result_s3_uri(self, execution_id):
@@ -102,38 +705,162 @@ class AthenaQuery:
         :return: The Athena execution output S3 URI
         :rtype: str
         """
-        if self.get_query_status(execution_id) == 'SUCCEEDED':
-            return self.client.get_query_execution(QueryExecutionId=execution_id)['QueryExecution']['ResultConfiguration']['OutputLocation']
+        execution = self._describe(execution_id)
+        if execution['Status']['State'] == 'SUCCEEDED':
+            return execution['ResultConfiguration']['OutputLocation']
         else:
             return None
 
         
-    def get_query_result_df(self, execution_id, wait=False):
+    def get_query_result_df(self, execution_id, wait=False, dtypes=None, downcast=True):
         """
         Get Athena query output in a Pandas dataframe
 
+        When `downcast` is set (the default), columns get dtypes derived from
+        the Athena column types: nullable ``Int8`` to ``Int64`` for integer
+        types, ``float32`` for ``real``, ``string`` for ``varchar``, ``boolean``
+        and datetimes for ``date`` and ``timestamp`` columns. Set `downcast` to
+        False for the dtypes `pandas.read_csv` infers (``int64``, ``object``,
+        date strings). For CSV results read with the Pandas engine this costs
+        one extra `GetQueryResults` call to fetch the column types.
+
+        `dtypes` overrides the dtype of individual columns. Parquet results from
+        UNLOAD queries and CSV results read with the pyarrow engine are typed by
+        pyarrow, `downcast` does not apply to them and `dtypes` is not supported.
+
         :param str execution_id: The Athena execution ID
+        :param bool wait: Wait for the query to complete if it is still queued or running
+        :param dict dtypes: The Pandas dtype for individual columns
+        :param bool downcast: Derive the Pandas dtypes from the Athena column types
         :return: The Athena execution output Pandas dataframe
         :rtype: pandas.DataFrame
+        :raises AthenaQueryError: if the query failed or was cancelled
+        :raises ValueError: if `dtypes` is given for a result typed by pyarrow
         """
-        if self.get_query_status(execution_id) == 'SUCCEEDED':
-            df = pd.read_csv(self.get_query_result_s3_uri(execution_id), header=0)
+        # Results read with explicit dtypes are not cached. Results typed by
+        # pyarrow ignore downcast and are cached under None.
+        if dtypes is None:
+            for cache_key in [('result', execution_id, downcast), ('result', execution_id, None)]:
+                df = self._cache_get(cache_key)
+                if df is not None:
+                    return df.copy()
+
+        execution = self._describe_completed(execution_id) if wait else self._describe(execution_id)
+        status = execution['Status']['State']
+        if status == 'SUCCEEDED':
+            output_location = execution['ResultConfiguration']['OutputLocation']
+            applied_downcast = downcast
+            if execution.get('Query', '').lstrip()[:6].upper() == 'UNLOAD':
+                if dtypes is not None:
+                    raise ValueError("dtypes is not supported for UNLOAD query results")
+                df = self._read_unload(execution)
+                applied_downcast = None
+            elif self._is_small_result(output_location):
+                df = self._read_query_results(execution, dtypes, downcast)
+            elif self.engine == 'pyarrow':
+                if dtypes is not None:
+                    raise ValueError("dtypes is not supported with the pyarrow engine")
+                with self._open_s3(output_location) as f:
+                    df = self._read_csv(f)
+                applied_downcast = None
+            else:
+                read_dtypes, parse_dates = dtypes, None
+                if downcast:
+                    derived, parse_dates = self._result_dtypes(execution_id)
+                    read_dtypes = {**derived, **(dtypes or {})}
+                with self._open_s3(output_location) as f:
+                    df = self._read_csv(f, read_dtypes, parse_dates)
+            if dtypes is None:
+                self._cache_put(('result', execution_id, applied_downcast), df.copy())
             return df
-        
-        status = self.get_query_status(execution_id)
-        if wait:
-            while status in ['RUNNING', 'QUEUED']:
-                time.sleep(1)
-                status = self.get_query_status(execution_id)
-            if status == 'FAILED':
-                print("Query failed")
-            if status == 'CANCELLED':
-                print("Query cancelled")
-            if status == 'SUCCEEDED':
-                df = pd.read_csv(self.get_query_result_s3_uri(execution_id), header=0)
-                return df
+
+        if status in ['FAILED', 'CANCELLED']:
+            raise AthenaQueryError(execution_id, status, execution['Status'].get('StateChangeReason'))
             
 
+    def get_query_result_dfs(self, execution_ids, wait=False, max_concurrency=None, downcast=True):
+        """
+        Get the output of several Athena queries in Pandas dataframes, fetching
+        them concurrently.
+
+        :param list[str] execution_ids: The Athena execution IDs
+        :param bool wait: Wait for queries that have not completed yet
+        :param int max_concurrency: The maximum number of results fetched at once, defaults to `max_concurrency`
+        :param bool downcast: Derive the Pandas dtypes from the Athena column types
+        :return: The Athena execution output Pandas dataframes, in the order of `execution_ids`
+        :rtype: list[pandas.DataFrame]
+        :raises AthenaQueryError: if any of the queries failed or was cancelled
+        """
+        with ThreadPoolExecutor(max_workers=max_concurrency or self.max_concurrency) as pool:
+            return list(pool.map(lambda execution_id: self.get_query_result_df(execution_id, wait=wait, downcast=downcast),
+                                 execution_ids))
+
+
+    def _metadata_fresh(self, entry):
+        """
+        Check whether a metadata cache entry is still within `metadata_ttl`.
+
+        :param tuple entry: The cache entry as (timestamp, metadata)
+        :rtype: bool
+        """
+        return entry is not None and (self.metadata_ttl is None or time.monotonic() - entry[0] <= self.metadata_ttl)
+
+
+    def _list_table_metadata(self):
+        """
+        Get the names of all tables and views in the Athena database, following
+        all result pages, cached per database.
+
+        :return: The Athena table names and table view names
+        :rtype: tuple[list[str], list[str]]
+        """
+        entry = self._list_cache.get(self.athena_database)
+        if not self._metadata_fresh(entry):
+            tables, views = [], []
+            paginator = self.client.get_paginator('list_table_metadata')
+            for page in paginator.paginate(CatalogName='AwsDataCatalog', DatabaseName=self.athena_database):
+                for x in page['TableMetadataList']:
+                    if x['TableType'] == 'EXTERNAL_TABLE':
+                        tables.append(x['Name'])
+                    elif x['TableType'] == 'VIRTUAL_VIEW':
+                        views.append(x['Name'])
+            entry = (time.monotonic(), (tables, views))
+            self._list_cache[self.athena_database] = entry
+        return entry[1]
+
+
+    def _get_table_metadata(self, table):
+        """
+        Get the metadata of an Athena table or table view, cached per database
+        and table.
+
+        :param str table: The Athena table or table view
+        :return: The Athena `TableMetadata`
+        :rtype: dict
+        """
+        key = (self.athena_database, table)
+        entry = self._meta_cache.get(key)
+        if not self._metadata_fresh(entry):
+            table_metadata = self.client.get_table_metadata(CatalogName='AwsDataCatalog', DatabaseName=self.athena_database, TableName=table)
+            entry = (time.monotonic(), table_metadata['TableMetadata'])
+            self._meta_cache[key] = entry
+        return entry[1]
+
+
+    def invalidate_metadata(self, table=None):
+        """
+        Drop cached table metadata, e.g. after creating or altering tables.
+
+        :param str table: The Athena table or table view, or None for all tables
+        """
+        if table is None:
+            self._meta_cache.clear()
+            self._list_cache.clear()
+        else:
+            self._meta_cache.pop((self.athena_database, table), None)
+            self._list_cache.pop(self.athena_database, None)
+
+
     def get_tables(self):
         """
         Get Athena tables
@@ -141,8 +868,8 @@ class AthenaQuery:
         :return: A list of Athena tables
         :rtype: list[str]
         """
-        table_metadata = self.client.list_table_metadata(CatalogName='AwsDataCatalog', DatabaseName=self.athena_database)
-        return list(map(lambda x: x['Name'], filter(lambda x: x['TableType'] == 'EXTERNAL_TABLE', table_metadata['TableMetadataList'])))
+        tables, _ = self._list_table_metadata()
+        return list(tables)
     
 
     def get_table_views(self):
@@ -152,8 +879,8 @@ class AthenaQuery:
         :return: A list of Athena table views
         :rtype: list[str]
         """
-        table_metadata = self.client.list_table_metadata(CatalogName='AwsDataCatalog', DatabaseName=self.athena_database)
-        return list(map(lambda x: x['Name'], filter(lambda x: x['TableType'] == 'VIRTUAL_VIEW', table_metadata['TableMetadataList'])))
+        _, views = self._list_table_metadata()
+        return list(views)
     
     
     def get_table_columns(self, table):
@@ -163,8 +890,7 @@ class AthenaQuery:
         :return: A list of columns
         :rtype: list[str]
         """
-        table_metadata = self.client.get_table_metadata(CatalogName='AwsDataCatalog', DatabaseName=self.athena_database, TableName=table)
-        return list(map(lambda x: x['Name'], table_metadata['TableMetadata']['Columns']))
+        return list(map(itemgetter('Name'), self._get_table_metadata(table)['Columns']))
 
  
     def get_table_schema(self, table):
@@ -174,8 +900,7 @@ class AthenaQuery:
         :return: A list of tuples for each column with type
         :rtype: list[tuple]
         """
-        table_metadata = self.client.get_table_metadata(CatalogName='AwsDataCatalog', DatabaseName=self.athena_database, TableName=table)
-        return list(map(lambda x: (x['Name'],x['Type']), table_metadata['TableMetadata']['Columns']))
+        return list(map(itemgetter('Name', 'Type'), self._get_table_metadata(table)['Columns']))
 
 
     def get_table_partition_columns(self, table):
@@ -185,8 +910,7 @@ class AthenaQuery:
         :return: A list of partition columns
         :rtype: list[str]
         """
-        table_metadata = self.client.get_table_metadata(CatalogName='AwsDataCatalog', DatabaseName=self.athena_database, TableName=table)
-        return list(map(lambda x: x['Name'], table_metadata['TableMetadata']['PartitionKeys']))
+        return list(map(itemgetter('Name'), self._get_table_metadata(table)['PartitionKeys']))
    
 
     def get_table_partition_schema(self, table):
@@ -196,29 +920,49 @@ class AthenaQuery:
         :return: A list of tuples for each column with type
         :rtype: list[tuple]
         """
-        table_metadata = self.client.get_table_metadata(CatalogName='AwsDataCatalog', DatabaseName=self.athena_database, TableName=table)
-        return list(map(lambda x: (x['Name'],x['Type']), table_metadata['TableMetadata']['PartitionKeys']))
+        return list(map(itemgetter('Name', 'Type'), self._get_table_metadata(table)['PartitionKeys']))
 
     
     def get_table_partitions(self, table):
         """
         Get partitions from Athena table
+
+        Partitions are listed from the Glue Data Catalog, falling back to a
+        SHOW PARTITIONS query if Glue access is denied or Glue does not know
+        the table. Values are escaped as in Hive partition paths.
         
         :return: A list of partitions
         :rtype: list[str]
+        :raises AthenaQueryError: if the SHOW PARTITIONS query failed or was cancelled
         """
+        try:
+            return self._get_glue_partitions(table)
+        except ClientError as e:
+            if e.response['Error']['Code'] not in _GLUE_FALLBACK_ERRORS:
+                raise
+
         query = f'show partitions {table}'
         execution_id = self.run_query(query)
-        status = self.get_query_status(execution_id)
-        while status not in ['SUCCEEDED', 'FAILED']:
-            time.sleep(1)
-            status = self.get_query_status(execution_id)
-        if status == 'FAILED':
-            print("Query failed")
+        execution = self._describe_completed(execution_id)
+        status = execution['Status']['State']
+        if status in ['FAILED', 'CANCELLED']:
+            raise AthenaQueryError(execution_id, status, execution['Status'].get('StateChangeReason'))
         if status == 'SUCCEEDED':
-            s3_uri = self.get_query_result_s3_uri(execution_id)
+            rows = self._iter_query_result_rows(execution_id)
+            next(rows)
+            return [row[0] for row in rows]
+
+
+    def _get_glue_partitions(self, table):
+        """
+        Get partitions from the Glue Data Catalog, formatted like SHOW PARTITIONS.
 
-            s3_bucket,s3_object = s3_uri.split('s3://')[1].split('/', maxsplit=1)
-            s3 = self.session.client('s3')
-            partitions = s3.get_object(Bucket=s3_bucket, Key=s3_object)['Body'].read()
-            return partitions.decode("utf-8").splitlines()
+        :param str table: The Athena table
+        :return: A list of partitions
+        :rtype: list[str]
+        """
+        keys = self.get_table_partition_columns(table)
+        paginator = self.glue.get_paginator('get_partitions')
+        return ['/'.join(f'{_hive_escape(k)}={_hive_escape(v)}' for k, v in zip(keys, x['Values']))
+                for page in paginator.paginate(DatabaseName=self.athena_database, TableName=table)
+                for x in page['Partitions']]
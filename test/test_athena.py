@@ -0,0 +1,549 @@
+import io
+import unittest
+from unittest import mock
+
+from botocore.exceptions import WaiterError
+from botocore.response import StreamingBody
+from botocore.stub import ANY, Stubber
+
+from montoux_athena.athena import AthenaQuery, _hive_escape, _normalize_sql
+
+
+def _execution(state, execution_id='x', **kwargs):
+    execution = {'QueryExecutionId': execution_id, 'Status': {'State': state}}
+    execution.update(kwargs)
+    return {'QueryExecution': execution}
+
+
+def _row(*values):
+    return {'Data': [{} if x is None else {'VarCharValue': x} for x in values]}
+
+
+def _body(data):
+    return {'Body': StreamingBody(io.BytesIO(data), len(data))}
+
+
+class NormalizeSqlTestCase(unittest.TestCase):
+
+    def test_collapses_whitespace_and_case(self):
+        self.assertEqual(_normalize_sql('  SELECT  *\n FROM  T  '), 'select * from t')
+
+    def test_keeps_string_literals(self):
+        self.assertEqual(_normalize_sql("SELECT * FROM t WHERE x = 'Ab  C'"), "select * from t where x ='Ab  C'")
+
+    def test_keeps_escaped_quotes(self):
+        self.assertEqual(_normalize_sql("SELECT 'It''s  A' AS X"), "select'It''s  A'as x")
+
+
+class AthenaQueryTestCase(unittest.TestCase):
+
+    CSV = b'"a","b"\n"1","x"\n"2","y"\n'
+
+    def setUp(self):
+        self.aq = self.make()
+
+    def make(self, **kwargs):
+        aq = AthenaQuery(region_name='us-east-1', athena_database='db', athena_output='s3://bucket/out/', **kwargs)
+        self.athena = Stubber(aq.client)
+        self.s3 = Stubber(aq.s3)
+        self.glue = Stubber(aq.glue)
+        for stubber in [self.athena, self.s3, self.glue]:
+            stubber.activate()
+            self.addCleanup(stubber.deactivate)
+        return aq
+
+    def expect_start(self, execution_id, **expected):
+        params = {'QueryString': ANY, 'QueryExecutionContext': ANY, 'ResultConfiguration': ANY}
+        params.update(expected)
+        self.athena.add_response('start_query_execution', {'QueryExecutionId': execution_id}, params)
+
+    def expect_describe(self, state, execution_id='x', **kwargs):
+        self.athena.add_response('get_query_execution', _execution(state, execution_id, **kwargs),
+                                 {'QueryExecutionId': execution_id})
+
+    def expect_csv_result(self, execution_id='x'):
+        self.expect_describe('SUCCEEDED', execution_id,
+                             ResultConfiguration={'OutputLocation': f's3://bucket/out/{execution_id}.csv'})
+        self.s3.add_response('get_object', _body(self.CSV), {'Bucket': 'bucket', 'Key': f'out/{execution_id}.csv'})
+
+
+class ResultCsvTestCase(AthenaQueryTestCase):
+
+    def test_read_from_s3(self):
+        self.expect_csv_result()
+        df = self.aq.get_query_result_df('x', downcast=False)
+        self.assertEqual(df['a'].tolist(), [1, 2])
+        self.assertEqual(df['b'].tolist(), ['x', 'y'])
+        self.assertEqual(str(df['a'].dtype), 'int64')
+        self.athena.assert_no_pending_responses()
+        self.s3.assert_no_pending_responses()
+
+    def expect_column_info(self, execution_id='x'):
+        self.athena.add_response('get_query_results', {'ResultSet': {'ResultSetMetadata': {'ColumnInfo': [
+            {'Name': 'a', 'Type': 'integer'}, {'Name': 'b', 'Type': 'varchar'}]}, 'Rows': []}},
+            {'QueryExecutionId': execution_id, 'MaxResults': 1})
+
+    def test_downcast(self):
+        self.expect_csv_result()
+        self.expect_column_info()
+        df = self.aq.get_query_result_df('x')
+        self.assertEqual([str(x) for x in df.dtypes], ['Int32', 'string'])
+        self.assertEqual(df['a'].tolist(), [1, 2])
+
+    def test_dtypes_override(self):
+        self.expect_csv_result()
+        self.expect_column_info()
+        df = self.aq.get_query_result_df('x', dtypes={'a': 'Int64'})
+        self.assertEqual([str(x) for x in df.dtypes], ['Int64', 'string'])
+
+    def test_cached_per_downcast(self):
+        aq = self.make(cache_size=4)
+        self.expect_csv_result()
+        self.expect_column_info()
+        self.expect_csv_result()
+        first = aq.get_query_result_df('x')
+        self.assertTrue(aq.get_query_result_df('x').equals(first))
+        self.assertEqual(str(aq.get_query_result_df('x', downcast=False)['a'].dtype), 'int64')
+        self.athena.assert_no_pending_responses()
+
+
+class PyarrowEngineTestCase(AthenaQueryTestCase):
+
+    def setUp(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+        self.aq = self.make(engine='pyarrow')
+
+    def test_read_from_s3(self):
+        self.expect_csv_result()
+        df = self.aq.get_query_result_df('x')
+        self.assertEqual(df['a'].tolist(), [1, 2])
+        self.assertEqual(df['b'].tolist(), ['x', 'y'])
+        self.athena.assert_no_pending_responses()
+
+    def test_dtypes_override(self):
+        self.expect_csv_result()
+        with self.assertRaises(ValueError):
+            self.aq.get_query_result_df('x', dtypes={'a': 'Int64'})
+
+    def test_cached_per_downcast(self):
+        aq = self.make(engine='pyarrow', cache_size=4)
+        self.expect_csv_result()
+        first = aq.get_query_result_df('x')
+        self.assertTrue(aq.get_query_result_df('x', downcast=False).equals(first))
+        self.athena.assert_no_pending_responses()
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            AthenaQuery(region_name='us-east-1', engine='polars')
+
+
+class BatchTestCase(AthenaQueryTestCase):
+
+    # A single worker keeps the order of stubbed calls deterministic
+
+    def test_run_queries(self):
+        self.expect_start('1', QueryExecutionContext={'Database': 'db'})
+        self.expect_start('2', QueryExecutionContext={'Database': 'other'}, WorkGroup='adhoc')
+        ids = self.aq.run_queries(['select 1', {'sql_query': 'select 2', 'database': 'other', 'WorkGroup': 'adhoc'}],
+                                  max_concurrency=1)
+        self.assertEqual(ids, ['1', '2'])
+        self.athena.assert_no_pending_responses()
+
+    def test_wait_all(self):
+        self.expect_describe('SUCCEEDED', '1')
+        self.expect_describe('FAILED', '2')
+        self.assertEqual(self.aq.wait_all(['1', '2'], max_concurrency=1), ['SUCCEEDED', 'FAILED'])
+
+    def test_get_query_result_dfs(self):
+        self.expect_csv_result('1')
+        self.expect_csv_result('2')
+        dfs = self.aq.get_query_result_dfs(['1', '2'], max_concurrency=1, downcast=False)
+        self.assertEqual([df['a'].tolist() for df in dfs], [[1, 2], [1, 2]])
+
+    def test_concurrent_submission(self):
+        aq = AthenaQuery(region_name='us-east-1', athena_database='db', athena_output='s3://bucket/out/')
+        aq.client.start_query_execution = lambda **kwargs: {'QueryExecutionId': kwargs['QueryString']}
+        queries = [f'select {i}' for i in range(20)]
+        self.assertEqual(aq.run_queries(queries, max_concurrency=4), queries)
+
+
+class WorkGroupTestCase(AthenaQueryTestCase):
+
+    def test_workgroup(self):
+        aq = self.make(workgroup='wg')
+        self.expect_start('1', WorkGroup='wg')
+        self.expect_start('2', WorkGroup='adhoc')
+        self.assertEqual(aq.run_query('select 1'), '1')
+        self.assertEqual(aq.run_query('select 1', WorkGroup='adhoc'), '2')
+        self.athena.assert_no_pending_responses()
+
+    def test_no_athena_output(self):
+        aq = AthenaQuery(region_name='us-east-1', athena_database='db', workgroup='wg')
+        with Stubber(aq.client) as athena:
+            athena.add_response('start_query_execution', {'QueryExecutionId': '1'}, {
+                'QueryString': 'select 1', 'QueryExecutionContext': {'Database': 'db'}, 'WorkGroup': 'wg'})
+            self.assertEqual(aq.run_query('select 1'), '1')
+            athena.assert_no_pending_responses()
+
+
+class WaitTestCase(AthenaQueryTestCase):
+
+    def test_success(self):
+        self.expect_describe('RUNNING')
+        self.expect_describe('SUCCEEDED')
+        self.assertEqual(self.aq._wait('x', delay=0), 'SUCCEEDED')
+        self.athena.assert_no_pending_responses()
+
+    def test_failure(self):
+        self.expect_describe('QUEUED')
+        self.expect_describe('FAILED')
+        self.assertEqual(self.aq._wait('x', delay=0), 'FAILED')
+
+    def test_cancelled(self):
+        self.expect_describe('CANCELLED')
+        self.assertEqual(self.aq._wait('x', delay=0), 'CANCELLED')
+
+    def test_timeout(self):
+        self.expect_describe('RUNNING')
+        self.expect_describe('RUNNING')
+        with self.assertRaises(WaiterError):
+            self.aq._wait('x', delay=0, max_attempts=2)
+
+    def test_no_limit_waits_until_completion(self):
+        for _ in range(3):
+            self.expect_describe('RUNNING')
+        self.expect_describe('SUCCEEDED')
+        with mock.patch('montoux_athena.athena._WAIT_MAX_ATTEMPTS', 2):
+            self.assertEqual(self.aq._wait('x', delay=0), 'SUCCEEDED')
+        self.athena.assert_no_pending_responses()
+
+
+class CacheTestCase(AthenaQueryTestCase):
+
+    def setUp(self):
+        self.aq = self.make(cache_size=2, cache_ttl=60)
+
+    def test_disabled_by_default(self):
+        aq = self.make()
+        self.expect_start('1')
+        self.expect_start('2')
+        self.assertEqual([aq.run_query('select 1'), aq.run_query('select 1')], ['1', '2'])
+
+    def test_hit_and_miss(self):
+        self.expect_start('1')
+        self.expect_start('2')
+        self.assertEqual(self.aq.run_query('select 1'), '1')
+        self.assertEqual(self.aq.run_query('SELECT   1'), '1')
+        self.assertEqual(self.aq.run_query('select 2'), '2')
+        self.athena.assert_no_pending_responses()
+
+    def test_write_statements_not_cached(self):
+        self.expect_start('1')
+        self.expect_start('2')
+        self.assertEqual(self.aq.run_query('insert into t values (1)'), '1')
+        self.assertEqual(self.aq.run_query('insert into t values (1)'), '2')
+
+    def test_key_includes_unload_and_overrides(self):
+        self.expect_start('1')
+        self.expect_start('2')
+        self.expect_start('3', WorkGroup='other')
+        self.assertEqual(self.aq.run_query('select 1'), '1')
+        self.assertEqual(self.aq.run_query('select 1', unload=True), '2')
+        self.assertEqual(self.aq.run_query('select 1', WorkGroup='other'), '3')
+
+    def test_ttl_expiry(self):
+        self.expect_start('1')
+        self.expect_start('2')
+        with mock.patch('montoux_athena.athena.time.monotonic', return_value=0):
+            self.assertEqual(self.aq.run_query('select 1'), '1')
+        with mock.patch('montoux_athena.athena.time.monotonic', return_value=30):
+            self.assertEqual(self.aq.run_query('select 1'), '1')
+        with mock.patch('montoux_athena.athena.time.monotonic', return_value=61):
+            self.assertEqual(self.aq.run_query('select 1'), '2')
+
+    def test_lru_eviction(self):
+        self.aq._cache_put(('k', 1), 'a')
+        self.aq._cache_put(('k', 2), 'b')
+        self.aq._cache_get(('k', 1))
+        self.aq._cache_put(('k', 3), 'c')
+        self.assertEqual(list(self.aq._cache), [('k', 1), ('k', 3)])
+
+    def test_discard(self):
+        self.aq._cache_put(('query', 'db', 'select 1'), 'x')
+        self.aq._cache_put(('result', 'x', True), object())
+        self.aq._cache_discard('x')
+        self.assertEqual(len(self.aq._cache), 0)
+
+    def test_failed_execution_discarded_by_wait(self):
+        self.expect_start('x')
+        self.expect_describe('FAILED')
+        self.expect_start('y')
+        self.assertEqual(self.aq.run_query('select 1'), 'x')
+        self.assertEqual(self.aq.get_query_status('x', wait=True), 'FAILED')
+        self.assertEqual(self.aq.run_query('select 1'), 'y')
+
+    def test_cancelled_execution_discarded_by_status(self):
+        self.expect_start('x')
+        self.expect_describe('CANCELLED')
+        self.expect_start('y')
+        self.assertEqual(self.aq.run_query('select 1'), 'x')
+        self.assertEqual(self.aq.get_query_status('x'), 'CANCELLED')
+        self.assertEqual(self.aq.run_query('select 1'), 'y')
+
+    def test_clear(self):
+        self.aq._cache_put(('k', 1), 'a')
+        self.aq.clear_cache()
+        self.assertEqual(len(self.aq._cache), 0)
+
+
+class MetadataTestCase(AthenaQueryTestCase):
+
+    def expect_list(self):
+        self.athena.add_response('list_table_metadata', {'TableMetadataList': [
+            {'Name': 't', 'TableType': 'EXTERNAL_TABLE'}, {'Name': 'v', 'TableType': 'VIRTUAL_VIEW'}]},
+            {'CatalogName': 'AwsDataCatalog', 'DatabaseName': 'db'})
+
+    def expect_table(self):
+        self.athena.add_response('get_table_metadata', {'TableMetadata': {
+            'Name': 't', 'Columns': [{'Name': 'a', 'Type': 'int'}], 'PartitionKeys': [{'Name': 'p', 'Type': 'string'}]}},
+            {'CatalogName': 'AwsDataCatalog', 'DatabaseName': 'db', 'TableName': 't'})
+
+    def test_list_shared_between_tables_and_views(self):
+        self.expect_list()
+        self.assertEqual(self.aq.get_tables(), ['t'])
+        self.assertEqual(self.aq.get_table_views(), ['v'])
+        self.athena.assert_no_pending_responses()
+
+    def test_table_metadata_shared_between_accessors(self):
+        self.expect_table()
+        self.assertEqual(self.aq.get_table_columns('t'), ['a'])
+        self.assertEqual(self.aq.get_table_schema('t'), [('a', 'int')])
+        self.assertEqual(self.aq.get_table_partition_columns('t'), ['p'])
+        self.assertEqual(self.aq.get_table_partition_schema('t'), [('p', 'string')])
+        self.athena.assert_no_pending_responses()
+
+    def test_ttl_expiry(self):
+        self.expect_table()
+        self.expect_table()
+        with mock.patch('montoux_athena.athena.time.monotonic', return_value=0):
+            self.aq.get_table_columns('t')
+        with mock.patch('montoux_athena.athena.time.monotonic', return_value=301):
+            self.aq.get_table_columns('t')
+        self.athena.assert_no_pending_responses()
+
+    def test_invalidate_metadata(self):
+        self.expect_list()
+        self.expect_table()
+        self.aq.get_tables()
+        self.aq.get_table_columns('t')
+        self.aq.invalidate_metadata('t')
+        self.expect_list()
+        self.expect_table()
+        self.aq.get_tables()
+        self.aq.get_table_columns('t')
+        self.athena.assert_no_pending_responses()
+
+    def test_ddl_invalidates_metadata(self):
+        self.expect_list()
+        self.aq.get_tables()
+        self.expect_start('x')
+        self.aq.run_query('CREATE TABLE u (a int)')
+        self.expect_list()
+        self.aq.get_tables()
+        self.athena.assert_no_pending_responses()
+
+    def test_select_keeps_metadata(self):
+        self.expect_list()
+        self.aq.get_tables()
+        self.expect_start('x')
+        self.aq.run_query('select * from t')
+        self.aq.get_tables()
+        self.athena.assert_no_pending_responses()
+
+    def test_list_follows_pages(self):
+        self.athena.add_response('list_table_metadata', {'TableMetadataList': [
+            {'Name': 't1', 'TableType': 'EXTERNAL_TABLE'}], 'NextToken': 'n'},
+            {'CatalogName': 'AwsDataCatalog', 'DatabaseName': 'db'})
+        self.athena.add_response('list_table_metadata', {'TableMetadataList': [
+            {'Name': 'v', 'TableType': 'VIRTUAL_VIEW'}, {'Name': 't2', 'TableType': 'EXTERNAL_TABLE'}]},
+            {'CatalogName': 'AwsDataCatalog', 'DatabaseName': 'db', 'NextToken': 'n'})
+        self.assertEqual(self.aq.get_tables(), ['t1', 't2'])
+        self.assertEqual(self.aq.get_table_views(), ['v'])
+
+
+class QueryResultsTestCase(AthenaQueryTestCase):
+
+    COLUMN_INFO = [
+        {'Name': 'a', 'Type': 'integer'},
+        {'Name': 'b', 'Type': 'varchar'},
+        {'Name': 'c', 'Type': 'boolean'},
+        {'Name': 'd', 'Type': 'date'},
+    ]
+
+    def expect_results(self, rows, column_info=COLUMN_INFO):
+        self.athena.add_response('get_query_results', {'ResultSet': {
+            'ResultSetMetadata': {'ColumnInfo': column_info}, 'Rows': rows[:1], }, 'NextToken': 'n'},
+            {'QueryExecutionId': 'x'})
+        self.athena.add_response('get_query_results', {'ResultSet': {
+            'ResultSetMetadata': {'ColumnInfo': column_info}, 'Rows': rows[1:], }},
+            {'QueryExecutionId': 'x', 'NextToken': 'n'})
+
+    def test_dml_header_skipped_and_downcast(self):
+        self.expect_results([_row('a', 'b', 'c', 'd'), _row('1', 'x', 'true', '2020-01-02'), _row(None, None, None, None)])
+        df = self.aq._read_query_results(_execution('SUCCEEDED', StatementType='DML')['QueryExecution'])
+        self.assertEqual(len(df), 2)
+        self.assertEqual([str(x) for x in df.dtypes], ['Int32', 'string', 'boolean', 'datetime64[us]'])
+        self.assertEqual(df['a'][0], 1)
+        self.assertTrue(df['c'][0])
+
+    def test_read_csv_types_without_downcast(self):
+        self.expect_results([_row('a', 'b', 'c', 'd'), _row('1', 'x', 'true', '2020-01-02'), _row('2', 'y', 'false', '2020-01-03')])
+        df = self.aq._read_query_results(_execution('SUCCEEDED', StatementType='DML')['QueryExecution'], downcast=False)
+        self.assertEqual(df['a'].tolist(), [1, 2])
+        self.assertEqual(str(df['a'].dtype), 'int64')
+        self.assertEqual(df['c'].tolist(), [True, False])
+        self.assertEqual(df['d'].tolist(), ['2020-01-02', '2020-01-03'])
+
+    def test_large_bigint_with_null(self):
+        self.expect_results([_row('n'), _row('9007199254740993'), _row(None)], [{'Name': 'n', 'Type': 'bigint'}])
+        df = self.aq._read_query_results(_execution('SUCCEEDED', StatementType='DML')['QueryExecution'])
+        self.assertEqual(str(df['n'].dtype), 'Int64')
+        self.assertEqual(df['n'][0], 9007199254740993)
+        self.assertTrue(df['n'].isna()[1])
+
+    def test_dtypes_override(self):
+        self.expect_results([_row('a', 'b', 'c', 'd'), _row('1', 'x', 'true', '2020-01-02')])
+        df = self.aq._read_query_results(_execution('SUCCEEDED', StatementType='DML')['QueryExecution'],
+                                         dtypes={'a': 'Int64'})
+        self.assertEqual(str(df['a'].dtype), 'Int64')
+
+    def test_utility_has_no_header(self):
+        self.expect_results([_row('1', 'x', 'true', '2020-01-02'), _row('2', 'y', 'false', '2020-01-03')])
+        df = self.aq._read_query_results(_execution('SUCCEEDED', StatementType='UTILITY')['QueryExecution'])
+        self.assertEqual(len(df), 2)
+
+    def expect_head(self, size):
+        self.s3.add_response('head_object', {'ContentLength': size}, {'Bucket': 'bucket', 'Key': 'out/x.csv'})
+
+    def test_small_result_uses_get_query_results(self):
+        self.aq = self.make(small_result_threshold=1000)
+        self.expect_describe('SUCCEEDED', StatementType='DML', ResultConfiguration={'OutputLocation': 's3://bucket/out/x.csv'})
+        self.expect_head(100)
+        self.expect_results([_row('a', 'b', 'c', 'd'), _row('1', 'x', 'true', '2020-01-02')])
+        df = self.aq.get_query_result_df('x')
+        self.assertEqual(df['b'].tolist(), ['x'])
+        self.athena.assert_no_pending_responses()
+        self.s3.assert_no_pending_responses()
+
+    def test_large_result_reads_s3(self):
+        self.aq = self.make(small_result_threshold=1000)
+        self.expect_describe('SUCCEEDED', ResultConfiguration={'OutputLocation': 's3://bucket/out/x.csv'})
+        self.expect_head(5000)
+        self.s3.add_response('get_object', _body(self.CSV), {'Bucket': 'bucket', 'Key': 'out/x.csv'})
+        df = self.aq.get_query_result_df('x', downcast=False)
+        self.assertEqual(df['a'].tolist(), [1, 2])
+        self.s3.assert_no_pending_responses()
+
+    def test_failed_query_raises(self):
+        from montoux_athena import AthenaQueryError
+
+        self.expect_describe('FAILED', Status={'State': 'FAILED', 'StateChangeReason': 'SYNTAX_ERROR'})
+        with self.assertRaises(AthenaQueryError) as cm:
+            self.aq.get_query_result_df('x')
+        self.assertEqual(cm.exception.state_change_reason, 'SYNTAX_ERROR')
+
+
+class UnloadTestCase(AthenaQueryTestCase):
+
+    def test_manifest(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+
+        buffer = io.BytesIO()
+        pq.write_table(pa.table({'a': [1, 2]}), buffer)
+        self.s3.add_response('get_object', _body(b's3://bucket/unload/1\ns3://bucket/unload/2\n'),
+                             {'Bucket': 'bucket', 'Key': 'out/x-manifest.csv'})
+        self.s3.add_response('get_object', _body(buffer.getvalue()), {'Bucket': 'bucket', 'Key': 'unload/1'})
+        self.s3.add_response('get_object', _body(buffer.getvalue()), {'Bucket': 'bucket', 'Key': 'unload/2'})
+        execution = _execution('SUCCEEDED', Statistics={'DataManifestLocation': 's3://bucket/out/x-manifest.csv'})
+        df = self.aq._read_unload(execution['QueryExecution'])
+        self.assertEqual(df['a'].tolist(), [1, 2, 1, 2])
+
+
+    def test_empty_manifest_keeps_columns(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+
+        self.s3.add_response('get_object', _body(b''), {'Bucket': 'bucket', 'Key': 'out/x-manifest.csv'})
+        self.athena.add_response('get_query_results', {'ResultSet': {'ResultSetMetadata': {'ColumnInfo': [
+            {'Name': 'a', 'Type': 'bigint'}, {'Name': 'b', 'Type': 'varchar'}]}, 'Rows': []}},
+            {'QueryExecutionId': 'x', 'MaxResults': 1})
+        execution = _execution('SUCCEEDED', Statistics={'DataManifestLocation': 's3://bucket/out/x-manifest.csv'})
+        df = self.aq._read_unload(execution['QueryExecution'])
+        self.assertEqual(list(df.columns), ['a', 'b'])
+        self.assertEqual(len(df), 0)
+
+    def test_wrapped_query(self):
+        queries = []
+        self.aq.client.start_query_execution = lambda **kwargs: queries.append(kwargs['QueryString']) or {'QueryExecutionId': 'x'}
+        self.aq.run_query('select 1 ; ;\n', unload=True)
+        self.aq.run_query('select 1 -- comment', unload=True)
+        self.aq.run_query('show tables', unload=True)
+        self.assertRegex(queries[0], r"^UNLOAD \(\nselect 1\n\) TO 's3://bucket/out/unload/[0-9a-f-]+/' WITH ")
+        self.assertTrue(queries[1].startswith('UNLOAD (\nselect 1 -- comment\n) TO '))
+        self.assertEqual(queries[2], 'show tables')
+
+
+class PartitionsTestCase(AthenaQueryTestCase):
+
+    def expect_keys(self, *keys):
+        self.athena.add_response('get_table_metadata', {'TableMetadata': {
+            'Name': 't', 'PartitionKeys': [{'Name': k, 'Type': 'string'} for k in keys]}},
+            {'CatalogName': 'AwsDataCatalog', 'DatabaseName': 'db', 'TableName': 't'})
+
+    def test_glue_partitions(self):
+        self.expect_keys('year', 'month')
+        self.glue.add_response('get_partitions', {'Partitions': [{'Values': ['2020', '01']}], 'NextToken': 'n'},
+                               {'DatabaseName': 'db', 'TableName': 't'})
+        self.glue.add_response('get_partitions', {'Partitions': [{'Values': ['2020', '02']}]},
+                               {'DatabaseName': 'db', 'TableName': 't', 'NextToken': 'n'})
+        self.assertEqual(self.aq.get_table_partitions('t'), ['year=2020/month=01', 'year=2020/month=02'])
+
+    def test_glue_partitions_hive_escaped(self):
+        self.expect_keys('ts', 'name')
+        self.glue.add_response('get_partitions', {'Partitions': [{'Values': ['2020-01-01 10:00:00', 'a/b=c%']},
+                                                                 {'Values': ['2020', 'x y']}]},
+                               {'DatabaseName': 'db', 'TableName': 't'})
+        self.assertEqual(self.aq.get_table_partitions('t'), ['ts=2020-01-01 10%3A00%3A00/name=a%2Fb%3Dc%25',
+                                                             'ts=2020/name=x y'])
+        self.assertEqual(_hive_escape(''), '__HIVE_DEFAULT_PARTITION__')
+
+    def test_throttling_not_swallowed(self):
+        from botocore.exceptions import ClientError
+
+        self.expect_keys('year')
+        self.glue.add_client_error('get_partitions', 'ThrottlingException')
+        with self.assertRaises(ClientError):
+            self.aq.get_table_partitions('t')
+
+    def test_show_partitions_fallback(self):
+        self.expect_keys('year')
+        self.glue.add_client_error('get_partitions', 'AccessDeniedException')
+        self.expect_start('x')
+        self.expect_describe('SUCCEEDED')
+        self.athena.add_response('get_query_results', {'ResultSet': {
+            'ResultSetMetadata': {'ColumnInfo': [{'Name': 'partition', 'Type': 'string'}]},
+            'Rows': [_row('year=2020'), _row('year=2021')]}}, {'QueryExecutionId': 'x'})
+        self.assertEqual(self.aq.get_table_partitions('t'), ['year=2020', 'year=2021'])
+
+
+if __name__ == '__main__':
+    unittest.main()